@@ -106,7 +106,7 @@ class Client():
     """A class that represents a client playing the game.
 
     This class is responsible for the following:
-        - connecting to the game server.
+        - connecting to the game server, or asking the lobby router which game server to connect to.
         - receiving and processing server messages.
         - coordinating with the server to play during the user's turn.
         - utilizing the GameHelper class to translate user's commands into a valid board to be passed back to the server.
@@ -114,31 +114,44 @@ class Client():
     Attributes:
         socket: An instance of the socket class. Default value is None.
         play_game: A boolean that represents whether the game can be played or not. Used as a status flag.
+        router_port: An integer representing the port number of the lobby router. None to connect straight to the server.
+        match_id: A string representing the id of the match given by the lobby router. Default value is None.
         SERVER_PORT: A constant integer representing the port number which the server socket will be listening on.
+        ROUTER_PORT: A constant integer representing the default port number which the lobby router will be listening on.
+        CONNECT_ATTEMPTS: A constant integer representing how many times the router is asked for another server when connecting fails.
     """
     SERVER_PORT = 65432
+    ROUTER_PORT = 65431
+    CONNECT_ATTEMPTS = 3
 
-    def __init__(self):
-        """Initializes the Client class."""
+    def __init__(self, router_port=None):
+        """Initializes the Client class.
+
+        Args:
+            router_port: An integer representing the port number of the lobby router. None to connect straight to the server.
+        """
         self.socket = None
         self.play_game = False
+        self.router_port = router_port
+        self.match_id = None
 
     def run(self):
         """Connects to the game server and starts the game when the server sends the right signal.
 
         This method does the following:
             - calls the get_server_address method.
-            - connects the socket to the server.
+            - connects the socket to the server, through the lobby router if the router_port attribute is set.
             - receives messages from the server and calls the process_server_message method.
             - checks the play_game attribute to decide whether to start playing.
             - closes the socket at the end of the session.
         """
         try:
-            # initialize the socket
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-
             # ask the user for the server ip and connect the socket to the server
-            self.socket.connect((self.get_server_address(), self.SERVER_PORT))
+            if self.router_port:
+                self.connect_through_router(self.get_server_address())
+            else:
+                self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                self.socket.connect((self.get_server_address(), self.SERVER_PORT))
 
             # read messages from the server and wait for the game to begin
             while True:
@@ -156,7 +169,8 @@ class Client():
         except Exception as e:
             print(e)
         finally:
-            self.socket.close()
+            if self.socket:
+                self.socket.close()
 
     def play(self):
         """Plays the game on the client side.
@@ -206,6 +220,58 @@ class Client():
             json_board = json.dumps(updated_board)
             self.socket.sendall(bytes(json_board, 'utf-8'))
 
+    def connect_through_router(self, router_ip):
+        """Asks the lobby router for the server of a new match and connects the socket to that server.
+
+        If connecting to the server fails, reports the server as unreachable to the router, which places the client
+        in a match on another server, up to CONNECT_ATTEMPTS times.
+
+        Args:
+            router_ip: A string representing the router's ip address.
+
+        Raises:
+            OSError: If the server could not be reached.
+            ValueError: If the router did not redirect the client to a server.
+        """
+        unreachable = False
+        for attempt in range(self.CONNECT_ATTEMPTS):
+            server_address = self.get_match_server(router_ip, unreachable)
+            try:
+                self.socket = socket.create_connection(server_address)
+                return
+            except OSError:
+                if attempt == self.CONNECT_ATTEMPTS - 1:
+                    raise
+                unreachable = True
+
+    def get_match_server(self, router_ip, unreachable=False):
+        """Asks the lobby router for the server of a new match.
+
+        Stores the match id sent back by the router, which is reported back if its server cannot be reached.
+
+        Args:
+            router_ip: A string representing the router's ip address.
+            unreachable: A boolean indicating whether the server of the client's previous match could not be reached.
+
+        Returns:
+            A tuple containing the server's ip address and port number.
+
+        Raises:
+            ValueError: If the router did not redirect the client to a server.
+        """
+        with socket.create_connection((router_ip, self.router_port)) as router_socket:
+            request = f'UNREACHABLE {self.match_id}' if unreachable else 'NEW'
+            router_socket.sendall(bytes(f'{request}-', 'utf-8'))
+            reply = router_socket.recv(1024).decode('utf-8').split('-')[0]
+
+        command, _, argument = reply.partition(' ')
+        if command != 'REDIRECT':
+            raise ValueError(reply or 'The router closed the connection')
+
+        server_address, self.match_id = argument.split(' ')
+        server_ip, server_port = server_address.rsplit(':', 1)
+        return (server_ip, int(server_port))
+
     def get_server_address(self):
         """Asks the user for the server's ip address.
 
@@ -1,4 +1,9 @@
+import argparse
 from classes import Client
 
-client = Client()
+parser = argparse.ArgumentParser(description='Runs the tic-tac-toe game client.')
+parser.add_argument('--router', nargs='?', type=int, const=Client.ROUTER_PORT, help='connect through the lobby router listening on this port')
+args = parser.parse_args()
+
+client = Client(args.router)
 client.run()
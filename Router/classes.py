@@ -0,0 +1,307 @@
+import socket
+import hashlib
+import bisect
+import time
+import uuid
+
+class HashRing():
+    """A class that represents a consistent-hash ring of game server nodes.
+
+    Each node is placed on the ring at REPLICAS points, so adding or removing a node only moves the keys
+    that fall between its points and their predecessors, which is about 1/N of the keys for N nodes.
+
+    Attributes:
+        nodes: A set containing the nodes on the ring. A node is a tuple containing an IP address and a port number.
+        points: A sorted list containing the hash values of the node replicas.
+        owners: A dictionary mapping each hash value in points to its node.
+        REPLICAS: A constant integer indicating how many points each node gets on the ring.
+    """
+
+    REPLICAS = 100
+
+    def __init__(self):
+        """Initializes the HashRing class."""
+        self.nodes = set()
+        self.points = []
+        self.owners = {}
+
+    def hash(self, key):
+        """Returns the position of the passed key on the ring.
+
+        Args:
+            key: A string to be hashed.
+
+        Returns:
+            An integer representing the position on the ring.
+        """
+        return int.from_bytes(hashlib.md5(bytes(key, 'utf-8')).digest()[:8], 'big')
+
+    def add_node(self, node):
+        """Adds a node to the ring. Does nothing if the node is already on the ring.
+
+        Args:
+            node: A tuple containing the node's IP address and port number.
+        """
+        if node in self.nodes:
+            return
+
+        self.nodes.add(node)
+        for replica in range(self.REPLICAS):
+            point = self.hash(f'{node[0]}:{node[1]}#{replica}')
+            self.owners[point] = node
+            bisect.insort(self.points, point)
+
+    def remove_node(self, node):
+        """Removes a node from the ring. Does nothing if the node is not on the ring.
+
+        Args:
+            node: A tuple containing the node's IP address and port number.
+        """
+        if node not in self.nodes:
+            return
+
+        self.nodes.remove(node)
+        self.points = [point for point in self.points if self.owners[point] != node]
+        self.owners = {point: owner for point, owner in self.owners.items() if owner != node}
+
+    def get_node(self, key, busy_nodes):
+        """Returns the first idle node clockwise from the passed key's position on the ring.
+
+        Args:
+            key: A string representing the key to be placed.
+            busy_nodes: A set containing the nodes that cannot take the key.
+
+        Returns:
+            A tuple containing the node's IP address and port number. None if the ring is empty or all the nodes are busy.
+        """
+        start = bisect.bisect(self.points, self.hash(key))
+        for index in range(len(self.points)):
+            node = self.owners[self.points[(start + index) % len(self.points)]]
+            if node not in busy_nodes:
+                return node
+        return None
+
+class Router():
+    """A class that represents the lobby router which places matches on the game server nodes.
+
+    This class is responsible for the following:
+        - keeping track of the nodes that joined or left, based on the messages sent by the nodes.
+        - pairing clients into matches and placing each match on an idle node using the HashRing class.
+        - redirecting the clients to the node that owns their match.
+        - skipping for a while the nodes that clients could not connect to.
+
+    Communication protocol, each message ending with the - delimiter like the game server messages:
+        - a client sends "NEW" to join a new match.
+        - a client sends "UNREACHABLE <match id>" when it could not connect to the node of its match.
+          The match is dropped, the node is skipped for SUSPECT_TIMEOUT seconds and the client is placed in a new match.
+        - the router replies with "REDIRECT <ip>:<port> <match id>", or an error message to be printed as is.
+        - a node sends "JOIN <port>" when it starts, "DONE <port>" when its match is done and "LEAVE <port>" when it stops.
+
+    A node plays one game at a time, so it owns at most one match. The router keeps the owner of each match,
+    so nodes joining or leaving never move the matches being played.
+
+    Attributes:
+        port: An integer representing the port number which the socket will be bound to. Default value is PORT.
+        socket: An instance of the socket class. Default value is None.
+        ring: An instance of the HashRing class containing the nodes.
+        matches: A dictionary mapping nodes to the id of their match. None if the node is idle.
+        owners: A dictionary mapping match ids to the nodes owning them.
+        suspects: A dictionary mapping the nodes that clients could not connect to, to the time they can be used again.
+        waiting_match: A string representing the id of the match waiting for a second player. Default value is None.
+        PORT: A constant integer representing the default port number which the socket will be bound to.
+        TIMEOUT: A constant float representing the seconds to wait for a connection to send its message.
+        SUSPECT_TIMEOUT: A constant float representing the seconds an unreachable node is skipped.
+            Longer than the time a node waits for a second player, so a node that is alive reports its match first.
+    """
+
+    PORT = 65431
+    TIMEOUT = 5.0
+    SUSPECT_TIMEOUT = 60.0
+
+    def __init__(self, port=PORT):
+        """Initializes the Router class.
+
+        Args:
+            port: An integer representing the port number which the socket will be bound to.
+        """
+        self.port = port
+        self.socket = None
+        self.ring = HashRing()
+        self.matches = {}
+        self.owners = {}
+        self.suspects = {}
+        self.waiting_match = None
+
+    def run(self):
+        """Runs the router.
+
+        Initializes the socket object, binds it to any ip address and the port number represented by the port attribute,
+        then handles the incoming connections one at a time until the user stops the router.
+        """
+        try:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.socket.bind(('', self.port))
+            self.socket.listen()
+            print(f'Routing incoming connections on port {self.port}')
+
+            while True:
+                connection, address = self.socket.accept()
+                with connection:
+                    connection.settimeout(self.TIMEOUT)
+                    try:
+                        self.handle_connection(connection, address)
+                    except OSError as e:
+                        print(f'Connection from {address} failed: ', e)
+        except KeyboardInterrupt:
+            print('Bye!')
+        except Exception as e:
+            print(e)
+        finally:
+            if self.socket:
+                self.socket.close()
+
+    def handle_connection(self, connection, address):
+        """Receives the message of a connection and sends back the reply, if any.
+
+        Args:
+            connection: An object representing the socket connection.
+            address: A tuple containing the IP address and the port number of the connection.
+        """
+        input = connection.recv(1024)
+        if not input:
+            return
+
+        reply = self.process_message(input.decode('utf-8').split('-')[0], address[0])
+        if reply:
+            connection.sendall(bytes(f'{reply}-', 'utf-8'))
+
+    def process_message(self, message, ip_address):
+        """Processes a message received from a client or a node.
+
+        Args:
+            message: A string representing the message, without the delimiter.
+            ip_address: A string representing the IP address the message was sent from.
+
+        Returns:
+            A string representing the reply to be sent back. None if there is no reply.
+        """
+        command, _, argument = message.partition(' ')
+
+        if command == 'NEW':
+            return self.redirect(self.place_player())
+        elif command == 'UNREACHABLE':
+            self.drop_match(argument)
+            return self.redirect(self.place_player())
+        elif command in ('JOIN', 'DONE', 'LEAVE') and argument.isdigit():
+            node = (ip_address, int(argument))
+            # the node is reachable again
+            self.suspects.pop(node, None)
+            if command == 'JOIN':
+                self.add_node(node)
+            elif command == 'DONE':
+                self.end_match(node)
+            else:
+                self.remove_node(node)
+            return None
+        return 'Unknown request!'
+
+    def redirect(self, match_id):
+        """Returns the reply redirecting a client to the node owning the passed match.
+
+        Args:
+            match_id: A string representing the match id. None if the match could not be placed.
+
+        Returns:
+            A string representing the reply to be sent to the client.
+        """
+        if not match_id:
+            return 'No game available! Please try again later'
+
+        ip_address, port = self.owners[match_id]
+        return f'REDIRECT {ip_address}:{port} {match_id}'
+
+    def place_player(self):
+        """Places a player in the match waiting for a second player, or in a new match on an idle node.
+
+        Returns:
+            A string representing the id of the player's match. None if all the nodes are busy or unreachable.
+        """
+        if self.waiting_match in self.owners:
+            match_id = self.waiting_match
+            self.waiting_match = None
+            return match_id
+
+        now = time.monotonic()
+        busy_nodes = {node for node, match_id in self.matches.items() if match_id}
+        busy_nodes.update(node for node, available_time in self.suspects.items() if available_time > now)
+
+        match_id = uuid.uuid4().hex
+        node = self.ring.get_node(match_id, busy_nodes)
+        if not node:
+            return None
+
+        self.matches[node] = match_id
+        self.owners[match_id] = node
+        self.waiting_match = match_id
+        print(f'Match {match_id} placed on {node[0]}:{node[1]}')
+        return match_id
+
+    def drop_match(self, match_id):
+        """Drops a match whose node could not be reached and skips the node for SUSPECT_TIMEOUT seconds.
+
+        The node stays on the ring, since a single client failing to connect does not mean the node is down.
+        Does nothing if the match is unknown.
+
+        Args:
+            match_id: A string representing the match id.
+        """
+        node = self.owners.get(match_id)
+        if not node:
+            return
+
+        self.suspects[node] = time.monotonic() + self.SUSPECT_TIMEOUT
+        self.end_match(node)
+        print(f'Node {node[0]}:{node[1]} could not be reached')
+
+    def add_node(self, node):
+        """Adds a node to the ring. Does nothing if the node already joined.
+
+        Args:
+            node: A tuple containing the node's IP address and port number.
+        """
+        if node in self.ring.nodes:
+            return
+
+        self.ring.add_node(node)
+        self.matches[node] = None
+        print(f'Node {node[0]}:{node[1]} joined')
+
+    def end_match(self, node):
+        """Ends the match placed on the node. Does nothing if the node has no match.
+
+        Args:
+            node: A tuple containing the node's IP address and port number.
+        """
+        match_id = self.matches.get(node)
+        if not match_id:
+            return
+
+        del self.owners[match_id]
+        self.matches[node] = None
+
+    def remove_node(self, node):
+        """Removes a node from the ring along with its match.
+
+        The matches placed on the other nodes are not moved.
+
+        Args:
+            node: A tuple containing the node's IP address and port number.
+        """
+        if node not in self.ring.nodes:
+            return
+
+        self.end_match(node)
+        self.ring.remove_node(node)
+        del self.matches[node]
+        print(f'Node {node[0]}:{node[1]} left')
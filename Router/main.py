@@ -0,0 +1,9 @@
+import argparse
+from classes import Router
+
+parser = argparse.ArgumentParser(description='Runs the tic-tac-toe lobby router.')
+parser.add_argument('--port', type=int, default=Router.PORT, help='the port number to listen on')
+args = parser.parse_args()
+
+router = Router(args.port)
+router.run()
@@ -0,0 +1,281 @@
+import array
+import json
+import mmap
+import os
+import struct
+import sys
+from classes import Game, Server
+
+def get_board_symmetries():
+    """Returns the symmetries of the game board.
+
+    Generates the rotations and reflections of the square board and keeps those that map every winning scenario
+    of the Game.WIN_MAP constant onto another winning scenario, so only geometrically equivalent positions are merged.
+
+    Returns:
+        A tuple of tuples, each containing Game.BOARD_DIMENSION ** 2 integers.
+        Each inner tuple maps a cell index (row * Game.BOARD_DIMENSION + column) to its transformed cell index.
+    """
+    last = Game.BOARD_DIMENSION - 1
+    transforms = (
+        lambda row, column: (row, column),
+        lambda row, column: (column, last - row),
+        lambda row, column: (last - row, last - column),
+        lambda row, column: (last - column, row),
+        lambda row, column: (row, last - column),
+        lambda row, column: (last - row, column),
+        lambda row, column: (column, row),
+        lambda row, column: (last - column, last - row)
+    )
+    win_map = {frozenset(scenario) for scenario in Game.WIN_MAP}
+
+    symmetries = []
+    for transform in transforms:
+        if {frozenset(transform(*cell) for cell in scenario) for scenario in win_map} != win_map:
+            continue
+        symmetry = [0] * (Game.BOARD_DIMENSION ** 2)
+        for row in range(Game.BOARD_DIMENSION):
+            for column in range(Game.BOARD_DIMENSION):
+                new_row, new_column = transform(row, column)
+                symmetry[row * Game.BOARD_DIMENSION + column] = new_row * Game.BOARD_DIMENSION + new_column
+        symmetries.append(tuple(symmetry))
+    return tuple(symmetries)
+
+class OpeningTrie():
+    """A class that represents a trie of the move sequences of recorded games.
+
+    Move sequences are canonicalized over the board symmetries before being inserted, so for example all 4 corner
+    openings share a single node. The canonical form of a sequence is the smallest of its transformed sequences,
+    which guarantees that the canonical form of a prefix is the prefix of the canonical form.
+
+    Each node holds the number of games that went through it, split by result (X won, O won or tie).
+    The trie can be saved to a file and opened with the OpeningIndex class for fast queries.
+
+    Attributes:
+        children: An array of integers holding CELL_COUNT child node indices per node. -1 if there is no child.
+        counts: An array of integers holding RESULT_COUNT game counts per node, in the order X wins, O wins and ties.
+        records_offset: An integer representing how many bytes of the records file were already added to the trie.
+        SYMMETRIES: A constant tuple containing the board symmetries returned by the get_board_symmetries function.
+        CELL_COUNT: A constant integer indicating the number of cells on the board.
+        RESULT_COUNT: A constant integer indicating the number of possible game results.
+        RESULTS: A constant dictionary mapping a winner's token (X/O), or None for a tie, to its position in the counts.
+        HEADER: A constant Struct describing the file header: magic bytes, node count and records offset.
+        MAGIC: A constant bytes object identifying index files.
+    """
+
+    SYMMETRIES = get_board_symmetries()
+    CELL_COUNT = Game.BOARD_DIMENSION ** 2
+    RESULT_COUNT = 3
+    RESULTS = {'X': 0, 'O': 1, None: 2}
+    HEADER = struct.Struct('=8sQQ')
+    MAGIC = b'TTTIDX01'
+
+    def __init__(self):
+        """Initializes the OpeningTrie class with a single root node."""
+        self.children = array.array('i', [-1] * self.CELL_COUNT)
+        self.counts = array.array('Q', [0] * self.RESULT_COUNT)
+        self.records_offset = 0
+
+    @classmethod
+    def canonicalize(cls, moves):
+        """Returns the canonical form of the passed move sequence.
+
+        Args:
+            moves: A list of tuples containing the row and column indices of the filled cells, in the order they were played.
+
+        Returns:
+            A tuple of integers representing the cell indices (row * Game.BOARD_DIMENSION + column) of the canonical sequence.
+
+        Raises:
+            ValueError: If a move is outside the board or a cell is filled more than once.
+        """
+        cells = []
+        for row, column in moves:
+            if not (0 <= row < Game.BOARD_DIMENSION and 0 <= column < Game.BOARD_DIMENSION):
+                raise ValueError('Move outside the board provided!')
+            cells.append(row * Game.BOARD_DIMENSION + column)
+        if len(set(cells)) != len(cells):
+            raise ValueError('Non-empty cell was updated!')
+
+        return min(tuple(symmetry[cell] for cell in cells) for symmetry in cls.SYMMETRIES)
+
+    def add_game(self, moves, winner):
+        """Adds a finished game to the trie.
+
+        Args:
+            moves: A list of tuples containing the row and column indices of the filled cells, in the order they were played.
+            winner: The winner's token (X/O), or None if the game was a tie.
+
+        Raises:
+            ValueError: If the moves or the winner are not valid.
+        """
+        if winner not in self.RESULTS:
+            raise ValueError('Wrong winner provided!')
+        result = self.RESULTS[winner]
+
+        node = 0
+        self.counts[result] += 1
+        for cell in self.canonicalize(moves):
+            child = self.children[node * self.CELL_COUNT + cell]
+            if child == -1:
+                child = len(self.counts) // self.RESULT_COUNT
+                self.children[node * self.CELL_COUNT + cell] = child
+                self.children.extend([-1] * self.CELL_COUNT)
+                self.counts.extend([0] * self.RESULT_COUNT)
+            node = child
+            self.counts[node * self.RESULT_COUNT + result] += 1
+
+    def add_records(self, records_path):
+        """Adds the games appended to the records file since the last call to the trie.
+
+        Only complete lines are read, so a game being written by the server is picked up by the next call.
+
+        Args:
+            records_path: A string representing the path of the records file written by Server.record_game.
+
+        Returns:
+            An integer representing the number of games added.
+        """
+        if not os.path.exists(records_path):
+            return 0
+
+        added_games = 0
+        with open(records_path, 'rb') as records_file:
+            records_file.seek(self.records_offset)
+            for line in records_file:
+                if not line.endswith(b'\n'):
+                    break
+                record = json.loads(line)
+                self.add_game(record['moves'], record['winner'])
+                self.records_offset += len(line)
+                added_games += 1
+        return added_games
+
+    def save(self, index_path):
+        """Saves the trie to a file that can be opened with the OpeningIndex class.
+
+        The file contains the header, followed by the counts and the children arrays in the machine's byte order.
+        The file is written next to its destination first and then renamed, so readers never see a partial index.
+
+        Args:
+            index_path: A string representing the path of the index file.
+        """
+        node_count = len(self.counts) // self.RESULT_COUNT
+
+        temporary_path = f'{index_path}.tmp'
+        with open(temporary_path, 'wb') as index_file:
+            index_file.write(self.HEADER.pack(self.MAGIC, node_count, self.records_offset))
+            self.counts.tofile(index_file)
+            self.children.tofile(index_file)
+        os.replace(temporary_path, index_path)
+
+    @classmethod
+    def load(cls, index_path):
+        """Loads a trie saved by the save method so more games can be added to it.
+
+        Args:
+            index_path: A string representing the path of the index file.
+
+        Returns:
+            An instance of the OpeningTrie class. An empty trie if the index file does not exist.
+
+        Raises:
+            ValueError: If the file is not a valid index file.
+        """
+        trie = cls()
+        if not os.path.exists(index_path):
+            return trie
+
+        with open(index_path, 'rb') as index_file:
+            magic, node_count, trie.records_offset = cls.HEADER.unpack(index_file.read(cls.HEADER.size))
+            if magic != cls.MAGIC:
+                raise ValueError('The provided index is corrupted!')
+            trie.counts = array.array('Q')
+            trie.counts.fromfile(index_file, node_count * cls.RESULT_COUNT)
+            trie.children = array.array('i')
+            trie.children.fromfile(index_file, node_count * cls.CELL_COUNT)
+        return trie
+
+class OpeningIndex():
+    """A class that answers prefix queries over an index file saved by the OpeningTrie class.
+
+    The file is memory-mapped and read in place, so opening it is instant regardless of its size
+    and a query only touches the nodes along the queried prefix.
+
+    Attributes:
+        node_count: An integer representing the number of nodes in the index.
+        records_offset: An integer representing how many bytes of the records file are covered by the index.
+    """
+
+    def __init__(self, index_path):
+        """Initializes the OpeningIndex class by memory-mapping the index file.
+
+        Args:
+            index_path: A string representing the path of the index file.
+
+        Raises:
+            ValueError: If the file is not a valid index file.
+        """
+        with open(index_path, 'rb') as index_file:
+            self._mmap = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.node_count, self.records_offset = OpeningTrie.HEADER.unpack_from(self._mmap)
+        if magic != OpeningTrie.MAGIC:
+            self.close()
+            raise ValueError('The provided index is corrupted!')
+
+        counts_size = self.node_count * OpeningTrie.RESULT_COUNT * array.array('Q').itemsize
+        self._view = memoryview(self._mmap)[OpeningTrie.HEADER.size:]
+        self._counts = self._view[:counts_size].cast('Q')
+        self._children = self._view[counts_size:].cast('i')
+
+    def query(self, moves):
+        """Returns the results of the recorded games that started with the passed moves, or any symmetric equivalent.
+
+        Args:
+            moves: A list of tuples containing the row and column indices of the filled cells, in the order they were played.
+                An empty list returns the results of all the recorded games.
+
+        Returns:
+            A dictionary containing the number of games won by X, won by O and tied.
+            For example:
+                {'X': 12, 'O': 3, 'TIE': 5}
+
+        Raises:
+            ValueError: If the moves are not valid.
+        """
+        node = 0
+        for cell in OpeningTrie.canonicalize(moves):
+            node = self._children[node * OpeningTrie.CELL_COUNT + cell]
+            if node == -1:
+                return {'X': 0, 'O': 0, 'TIE': 0}
+
+        offset = node * OpeningTrie.RESULT_COUNT
+        return {
+            'X': self._counts[offset + OpeningTrie.RESULTS['X']],
+            'O': self._counts[offset + OpeningTrie.RESULTS['O']],
+            'TIE': self._counts[offset + OpeningTrie.RESULTS[None]]
+        }
+
+    def close(self):
+        """Releases the memory-mapped index file."""
+        for view in ('_counts', '_children', '_view'):
+            if hasattr(self, view):
+                getattr(self, view).release()
+        self._mmap.close()
+
+    def __enter__(self):
+        """Returns the OpeningIndex instance to be used in a with statement."""
+        return self
+
+    def __exit__(self, *args):
+        """Calls the close method at the end of the with statement."""
+        self.close()
+
+if __name__ == '__main__':
+    # update the index with the games recorded since the last run
+    index_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(Server.RECORDS_PATH), 'games.idx')
+    trie = OpeningTrie.load(index_path)
+    added_games = trie.add_records(Server.RECORDS_PATH)
+    trie.save(index_path)
+    print(f'Added {added_games} games to {index_path}')
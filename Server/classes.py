@@ -1,5 +1,8 @@
 import socket
+import select
 import json
+import os
+import time
 
 class Player():
     """A class that represents a tic-tac-toe player.
@@ -46,6 +49,7 @@ class Game():
         player_2: An instance of the Player class representing the second player.
         winner: A reference to the winning player instance if the game is won. Default value is None.
         ended: A boolean indicating if the game has ended. Default value is False.
+        moves: A list of tuples containing the row and column indices of the filled cells, in the order they were played.
         board: A list of 3 lists each with 3 elements. Represents the game board. Default value for the elements is a single space.
         BOARD_DIMENSION: A constant integer indicating the height and width of the board.
         WIN_MAP: A constant tuple containing the cell-coordinates of all the possible scenarios for a win.
@@ -82,6 +86,7 @@ class Game():
         self.player_2 = player_2
         self.winner = None
         self.ended = False
+        self.moves = []
         self.board = [
             [' ', ' ', ' '],
             [' ', ' ', ' '],
@@ -159,6 +164,7 @@ class Game():
         
         # update the game board at the changed cell with the player's token ( X/O)
         self.board[updated_row][updated_column] = self.get_player_token(player)
+        self.moves.append((updated_row, updated_column))
         
         # check if there is a win or a tie and mark the game as ended
         if self.is_a_win() or self.is_a_tie():
@@ -237,6 +243,52 @@ class Game():
         else:
             raise ValueError('Wrong cell value provided!')
 
+    def to_dict(self):
+        """Returns the game progress as a JSON-serializable dictionary.
+
+        The players are not included, the caller is responsible for restoring them.
+
+        Returns:
+            A dictionary containing the board, the moves and the ended flag.
+            For example:
+                {'board': [['X', ' ', ' '], [' ', 'O', ' '], [' ', ' ', ' ']], 'moves': [[0, 0], [1, 1]], 'ended': False}
+        """
+        return {
+            'board': [list(row) for row in self.board],
+            'moves': [list(move) for move in self.moves],
+            'ended': self.ended
+        }
+
+    @classmethod
+    def from_dict(cls, player_1, player_2, data):
+        """Creates a Game instance from a dictionary returned by the to_dict method.
+
+        Args:
+            player_1: An instance of the Player class representing the first player.
+            player_2: An instance of the Player class representing the second player.
+            data: A dictionary containing the board, the moves and the ended flag.
+
+        Returns:
+            An instance of the Game class with the restored progress.
+
+        Raises:
+            ValueError: If the players or the board are not valid.
+        """
+        game = cls(player_1, player_2)
+        board = data.get('board')
+        if (not isinstance(board, list)) or len(board) != cls.BOARD_DIMENSION:
+            raise ValueError('The provided board is corrupted!')
+        for row in board:
+            if (not isinstance(row, list)) or len(row) != cls.BOARD_DIMENSION:
+                raise ValueError('The provided board is corrupted!')
+        game.board = [list(row) for row in board]
+        game.moves = [tuple(move) for move in data.get('moves', [])]
+        game.ended = bool(data.get('ended'))
+        return game
+
+class HandoverRequested(Exception):
+    """Raised when a new server process asks to take over the running session."""
+
 class Server():
     """A class that represents the server of the game.
 
@@ -246,46 +298,303 @@ class Server():
         - managing the game session.
         - managing the players' turns.
         - sending/receiving messages to/from connected clients.
+        - handing the session over to a new server process without stopping the game.
+        - reporting to the lobby router, if any, when it joins, finishes a game or leaves.
+
+    When placed behind the lobby router, the server keeps its listening socket open at the end of the session,
+    so the clients redirected to it while the game was played are accepted by the next session.
 
     Attributes:
-        socket: An instance of the socket class. Default value is None.
+        port: An integer representing the port number which the socket will be bound to. Default value is PORT.
+        router_address: A tuple containing the lobby router's IP address and port number. Default value is None.
+        handover_path: A string representing the path of the Unix domain socket used for handovers on this port.
+        socket: An instance of the socket class. Default value is the passed listening socket, None if there is none.
+        handover_socket: An instance of the socket class listening for handover requests on handover_path. Default value is None.
         clients: A list containing instances of the Client class.
         current_player: An instance of the Client class. Default value is None.
-        PORT: A constant integer representing the port number which the socket will be bound to.
+        game: An instance of the Game class being played. Default value is None.
+        awaiting_move: A boolean indicating if the board was sent to the current player and their move is pending. Default value is False.
+        handed_over: A boolean indicating if the session was handed over to a new server process. Default value is False.
+        stopped: A boolean indicating if the server was stopped by the user. Default value is False.
+        joined: A boolean indicating if the server is known to the lobby router. Default value is False.
+        match_served: A boolean indicating if a client was accepted or taken over during the session. Default value is False.
+        setup_failed: A boolean indicating if the session could not be set up, for example if the port is in use. Default value is False.
+        PORT: A constant integer representing the default port number which the socket will be bound to.
+        HANDOVER_PATH: A constant string representing the path template of the Unix domain socket used for handovers.
+        HANDOVER_TIMEOUT: A constant float representing the seconds to wait for the other server during a handover.
+        MATCH_TIMEOUT: A constant float representing the seconds a player waits for an opponent behind the lobby router.
+        RECORDS_PATH: A constant string representing the path of the file the finished games are appended to, next to this module.
     """
 
     PORT = 65432
+    HANDOVER_PATH = '/tmp/tic-tac-toe-handover-{port}.sock'
+    HANDOVER_TIMEOUT = 2.0
+    MATCH_TIMEOUT = 30.0
+    RECORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'games.jsonl')
 
-    def __init__(self):
-        """Initializes the Server class."""
-        self.socket = None
+    def __init__(self, port=PORT, router_address=None, listening_socket=None):
+        """Initializes the Server class.
+
+        Args:
+            port: An integer representing the port number which the socket will be bound to.
+            router_address: A tuple containing the lobby router's IP address and port number. None if there is no router.
+            listening_socket: An instance of the socket class already bound to the port, kept from a previous session.
+        """
+        self.port = port
+        self.router_address = router_address
+        self.handover_path = self.HANDOVER_PATH.format(port=port)
+        self.socket = listening_socket
+        self.handover_socket = None
         self.clients = []
         self.current_player = None
+        self.game = None
+        self.awaiting_move = False
+        self.handed_over = False
+        self.stopped = False
+        self.joined = False
+        self.match_served = False
+        self.setup_failed = False
+
+    @staticmethod
+    def create_socket(port):
+        """Creates a socket bound to any ip address and the passed port number.
+
+        Args:
+            port: An integer representing the port number which the socket will be bound to.
 
-    def run(self):
+        Returns:
+            An instance of the socket class.
+
+        Raises:
+            OSError: If the socket could not be bound, for example if the port is already in use.
+        """
+        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            server_socket.bind(('', port))
+        except OSError:
+            server_socket.close()
+            raise
+        return server_socket
+
+    def run(self, take_over=False):
         """Runs the game session.
 
         Performs the following actions:
-            - Initializes the socket object and binds it to any ip address and the port number represented by the constant PORT.
+            - Initializes the socket object and binds it to any ip address and the port number represented by the port attribute,
+              unless a listening socket was passed.
+              If take_over is True, the socket, the clients and the game are received from the running server instead.
+            - lets the lobby router know that the server joined, if not taking over.
+            - listens for handover requests.
             - accepts the client connections.
-            - starts the game.
-            - closes the socket at the end of the session.
+            - starts or resumes the game, which goes on if a handover fails.
+            - closes the socket at the end of the session, unless the server is placed behind the lobby router.
+              If the session was handed over, the clients are not notified and their connections are left open.
+            - lets the lobby router know that the match is done, or that the server left if it was stopped by the user
+              or could not be set up.
+
+        Args:
+            take_over: A boolean indicating whether to take over the session of an already running server.
         """
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.bind(('', self.PORT))
-            self.accept_clients()
-            print(f'{len(self.clients)} clients are now connected')
-            print('Starting the game')
-            self.play_game()
+            self.setup_failed = True
+            if take_over:
+                self.take_over()
+                self.joined = bool(self.router_address)
+                self.match_served = bool(self.clients)
+            else:
+                if not self.socket:
+                    self.socket = self.create_socket(self.port)
+                self.notify_router('JOIN')
+            self.listen_for_handover()
+            self.setup_failed = False
+
+            while True:
+                try:
+                    if not self.game:
+                        self.accept_clients()
+                        print(f'{len(self.clients)} clients are now connected')
+                        print('Starting the game')
+                    self.play_game()
+                    break
+                except HandoverRequested:
+                    # keep playing if the handover failed
+                    if self.hand_over():
+                        break
         except KeyboardInterrupt:
+            self.stopped = True
             print('Bye!')
         except Exception as e:
             print(e)
         finally:
             for player in self.clients:
-                self.send_message_to_player(player, 'Server stopped!')
-            self.socket.close()
+                try:
+                    if not self.handed_over:
+                        self.send_message_to_player(player, 'Server stopped!')
+                    player.connection.close()
+                except OSError:
+                    # the player has already disconnected
+                    pass
+            if self.handover_socket:
+                self.handover_socket.close()
+                os.unlink(self.handover_path)
+            if self.socket and not self.router_address:
+                self.socket.close()
+            if not self.handed_over:
+                if self.joined and (self.stopped or self.setup_failed):
+                    self.notify_router('LEAVE')
+                elif self.match_served:
+                    self.notify_router('DONE')
+
+    def notify_router(self, message):
+        """Sends a message about this server to the lobby router.
+
+        Runs only if the router_address attribute is set. The router identifies the server by its IP address and port,
+        so the message is sent along with the port number, for example "DONE 65432".
+        Failing to reach the router is printed and does not stop the server.
+
+        Args:
+            message: A string that is one of the three messages: "JOIN", "DONE" or "LEAVE".
+        """
+        if not self.router_address:
+            return
+
+        try:
+            with socket.create_connection(self.router_address) as connection:
+                connection.sendall(bytes(f'{message} {self.port}-', 'utf-8'))
+            if message == 'JOIN':
+                self.joined = True
+        except OSError as e:
+            print(f'Could not reach the router: {e}')
+
+    def listen_for_handover(self):
+        """Initializes the Unix domain socket on handover_path and listens for handover requests.
+
+        A stale socket file left behind by a crashed server is removed first.
+        """
+        if os.path.exists(self.handover_path):
+            os.unlink(self.handover_path)
+
+        self.handover_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.handover_socket.bind(self.handover_path)
+        self.handover_socket.listen()
+
+    def wait_for(self, readable_socket, timeout=None):
+        """Blocks until the passed socket is readable.
+
+        Args:
+            readable_socket: An instance of the socket class to wait for.
+            timeout: A float representing the seconds to wait. None to wait without a limit.
+
+        Returns:
+            A boolean representing whether the socket is readable. False if the timeout expired.
+
+        Raises:
+            HandoverRequested: If a new server process asked to take over the session while waiting.
+        """
+        waiting_sockets = [readable_socket]
+        if self.handover_socket:
+            waiting_sockets.append(self.handover_socket)
+
+        ready_sockets, _, _ = select.select(waiting_sockets, [], [], timeout)
+        if self.handover_socket in ready_sockets:
+            raise HandoverRequested()
+        return readable_socket in ready_sockets
+
+    def hand_over(self):
+        """Hands the running session over to the new server process.
+
+        Sends the state of the session, along with the file descriptors of the listening socket and the client connections,
+        over the handover connection. The new server process acknowledges the state once it has restored it.
+
+        If the handover fails or the new server does not answer within HANDOVER_TIMEOUT seconds, the session is kept
+        and can be resumed, since no message was sent to the clients.
+
+        Returns:
+            A boolean representing whether the session was handed over.
+        """
+        connection, _ = self.handover_socket.accept()
+        with connection:
+            connection.settimeout(self.HANDOVER_TIMEOUT)
+            state = {
+                'clients': [player.name for player in self.clients],
+                'current_player': self.clients.index(self.current_player) if self.current_player else None,
+                'awaiting_move': self.awaiting_move,
+                'game': self.game.to_dict() if self.game else None
+            }
+            file_descriptors = [self.socket.fileno()] + [player.connection.fileno() for player in self.clients]
+
+            # keep the session until the new server confirms it has restored it
+            try:
+                socket.send_fds(connection, [bytes(json.dumps(state), 'utf-8')], file_descriptors)
+                acknowledgement = connection.recv(1024)
+            except OSError as e:
+                print('Handover failed: ', e)
+                return False
+            if acknowledgement != b'OK':
+                print('Handover failed: the new server did not acknowledge the session')
+                return False
+            self.handed_over = True
+
+            # release the handover path before closing the connection, which lets the new server listen on it
+            self.handover_socket.close()
+            self.handover_socket = None
+            os.unlink(self.handover_path)
+            print('Session handed over to the new server')
+            return True
+
+    def take_over(self):
+        """Takes over the session of the running server through the Unix domain socket on handover_path.
+
+        Restores the listening socket, the client connections and the game, then waits for the old server to exit.
+        The restored session is kept only once acknowledged. Before that, a failure closes the restored connections
+        without notifying the clients, so the old server can keep playing.
+
+        Raises:
+            OSError: If the old server could not be reached or did not answer within HANDOVER_TIMEOUT seconds.
+            ValueError: If the received state is not valid.
+        """
+        start_time = time.perf_counter()
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.settimeout(self.HANDOVER_TIMEOUT)
+            connection.connect(self.handover_path)
+            message, file_descriptors, _, _ = socket.recv_fds(connection, 4096, 3)
+            restored_sockets = [socket.socket(fileno=file_descriptor) for file_descriptor in file_descriptors]
+
+            try:
+                state = json.loads(message.decode('utf-8'))
+                clients = []
+                for name, client_connection in zip(state['clients'], restored_sockets[1:]):
+                    clients.append(Client(name, client_connection, client_connection.getpeername()))
+
+                current_player = None
+                if state['current_player'] is not None:
+                    current_player = clients[state['current_player']]
+                game = None
+                if state['game']:
+                    game = Game.from_dict(clients[0], clients[1], state['game'])
+                connection.sendall(b'OK')
+            except Exception:
+                # only close the copies of the connections, the old server still owns the session
+                for restored_socket in restored_sockets:
+                    restored_socket.close()
+                raise
+
+            self.socket = restored_sockets[0]
+            self.clients = clients
+            self.current_player = current_player
+            self.game = game
+            self.awaiting_move = state['awaiting_move']
+
+            # wait for the old server to release the handover path and exit
+            try:
+                connection.recv(1024)
+            except socket.timeout:
+                print('The old server did not release the handover path in time')
+
+        elapsed_time = (time.perf_counter() - start_time) * 1000
+        print(f'Took over {len(self.clients)} clients in {elapsed_time:.2f} ms')
 
     def accept_clients(self):
         """listens to and accepts 2 client connections.
@@ -293,44 +602,65 @@ class Server():
         Runs only if the socket is initialized.
 
         Each accepted connection is created as a Client object and added to the clients list attribute.
+        A client that disconnects before being welcomed is dropped.
+
+        Raises:
+            TimeoutError: If the server is placed behind the lobby router and no second player joined within MATCH_TIMEOUT seconds.
         """
         if not self.socket:
             return
 
         self.socket.listen()
-        print(f'Listening for incoming connections on port {self.PORT}')
+        print(f'Listening for incoming connections on port {self.port}')
 
         while len(self.clients) < 2:
+            # the router placed a match here, do not keep its first player waiting forever
+            timeout = self.MATCH_TIMEOUT if (self.router_address and self.clients) else None
+            if not self.wait_for(self.socket, timeout):
+                raise TimeoutError('No second player joined in time')
+
             connection, address = self.socket.accept()
+            self.match_served = True
             player = Client(f'Player {len(self.clients) + 1}', connection, address)
             print(f'{player.name} connected by {player.address}')
+            try:
+                if len(self.clients) == 0:
+                    self.send_message_to_player(player, 'Welcome! Waiting for a second player to join')
+                else:
+                    self.send_message_to_player(player, 'Welcome!')
+            except OSError as e:
+                print(f'{player.name} disconnected: ', e)
+                connection.close()
+                continue
             self.clients.append(player)
-            if len(self.clients) == 1:
-                self.send_message_to_player(player, 'Welcome! Waiting for a second player to join')
-            else:
-                self.send_message_to_player(player, 'Welcome!')
 
     def play_game(self):
-        """Starts and plays the game.
+        """Starts or resumes and plays the game.
 
         Plays the game in iterations as follows:
             - determines the current player.
             - sends a message to the next player informing the player to wait.
             - sends the current board to the current player and gets the updated board back.
             - calls the process method from the Game instance and checks if the game ended.
-            - if the game has ended, stops the game and sends the results to the players.
+            - if the game has ended, stops the game, records the game and sends the results to the players.
             - if the game has not ended, switches players' turns and continues to the next iteration.
+
+        If the game was taken over from another server, the first iteration skips the messages already sent by that server.
         """
-        self.current_player = self.clients[0]
-        game = Game(self.current_player, self.next_player)
-        
-        # Inform the players that the game has started
-        for player in self.clients:
-            self.send_message_to_player(player, 'START')
+        if not self.game:
+            self.current_player = self.clients[0]
+            self.game = Game(self.current_player, self.next_player)
+
+            # Inform the players that the game has started
+            for player in self.clients:
+                self.send_message_to_player(player, 'START')
+
+        game = self.game
 
         while True:
-            # inform the next player that it is their opponent's turn
-            self.send_message_to_player(self.next_player, 'WAIT')
+            if not self.awaiting_move:
+                # inform the next player that it is their opponent's turn
+                self.send_message_to_player(self.next_player, 'WAIT')
 
             # send the current game board to the current player and get the updated board back
             json_board = json.dumps(game.board)
@@ -356,6 +686,8 @@ class Server():
 
             self.change_turn()
 
+        # record the game first, since it has ended even if the results cannot be delivered
+        self.record_game(game)
         self.send_game_results(game.winner)
 
     def change_turn(self):
@@ -372,19 +704,28 @@ class Server():
     def get_updated_board(self, player, json_board):
         """Retrieves the updated board from the player.
 
+        The board is not sent again if the player already received it and their move is pending.
+
         Args:
             player: An instance of the Client class representing a player.
             json_board: A JSON string-representaion of the game board to be sent to the player.
 
         Returns:
             A list representing the updated board retrieved from the player. None if the player has disconnected.
+
+        Raises:
+            HandoverRequested: If a new server process asked to take over the session while waiting for the player.
         """
         # send the current game board to the player
-        self.send_message_to_player(player, json_board)
+        if not self.awaiting_move:
+            self.send_message_to_player(player, json_board)
+            self.awaiting_move = True
 
         # receive the updated board from the player
         connection = player.connection
+        self.wait_for(connection)
         input = connection.recv(1024)
+        self.awaiting_move = False
 
         # check if the client has disconnected and return None
         if not input:
@@ -424,3 +765,20 @@ class Server():
                 self.send_message_to_player(client, 'WON')
             else:
                 self.send_message_to_player(client, 'LOST')
+
+    def record_game(self, game):
+        """Appends the finished game to the file represented by the constant RECORDS_PATH.
+
+        Each game is written as a JSON-encoded line containing the moves and the winner's token (X/O), or null for a tie.
+        For example:
+            {"moves": [[0, 0], [1, 1], [0, 1], [2, 2], [0, 2]], "winner": "X"}
+
+        Args:
+            game: An instance of the Game class that has ended.
+        """
+        record = {
+            'moves': [list(move) for move in game.moves],
+            'winner': game.get_player_token(game.winner) if game.winner else None
+        }
+        with open(self.RECORDS_PATH, 'a') as records_file:
+            records_file.write(json.dumps(record) + '\n')
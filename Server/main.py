@@ -1,4 +1,38 @@
+import argparse
 from classes import Server
 
-server = Server()
-server.run()
+parser = argparse.ArgumentParser(description='Runs the tic-tac-toe game server.')
+parser.add_argument('--port', type=int, default=Server.PORT, help='the port number to listen on')
+parser.add_argument('--router', help='the lobby router address as ip:port, to serve games placed by the router')
+parser.add_argument('--take-over', action='store_true', help='take over the session of the server running on the same port')
+args = parser.parse_args()
+
+router_address = None
+if args.router:
+    router_ip, router_port = args.router.rsplit(':', 1)
+    router_address = (router_ip, int(router_port))
+
+if not router_address:
+    Server(args.port).run(take_over=args.take_over)
+else:
+    # when placed behind a router, keep the listening socket and serve games one after the other
+    # until stopped, handed over or a session could not be set up
+    listening_socket = None
+    if not args.take_over:
+        try:
+            listening_socket = Server.create_socket(args.port)
+        except OSError as e:
+            print(e)
+            raise SystemExit(1)
+
+    take_over = args.take_over
+    while True:
+        server = Server(args.port, router_address, listening_socket)
+        server.run(take_over=take_over)
+        take_over = False
+        listening_socket = server.socket
+        if server.stopped or server.handed_over or server.setup_failed:
+            break
+
+    if listening_socket:
+        listening_socket.close()